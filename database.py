@@ -1,7 +1,9 @@
 # database.py
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from uuid import uuid4
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import declarative_base
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,19 +11,59 @@ load_dotenv()
 # Load the connection string from the .env file
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Create the SQLAlchemy Engine
-engine = create_engine(DATABASE_URL)
+# The async engine talks to PostgreSQL through asyncpg. Plain postgresql:// and
+# postgresql+psycopg2:// URLs from existing .env files are switched over to it.
+database_url = make_url(DATABASE_URL)
+if database_url.drivername in ("postgresql", "postgresql+psycopg2"):
+    database_url = database_url.set(drivername="postgresql+asyncpg")
 
-# Create a session local class for interacting with the DB
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Raise the asyncpg prepared statement cache from SQLAlchemy's default of 100 to 256
+# statements per connection, so repeated queries skip server-side parsing/planning.
+# Behind PgBouncer in transaction pooling mode, add ?prepared_statement_cache_size=0 to
+# DATABASE_URL: a prepared statement lives on one server connection and the next
+# transaction may land on another. That setting also turns off asyncpg's own statement
+# cache and gives every statement a unique name, so names can't collide across them.
+connect_args = {}
+if database_url.drivername == "postgresql+asyncpg":
+    if "prepared_statement_cache_size" not in database_url.query:
+        database_url = database_url.update_query_dict({"prepared_statement_cache_size": "256"})
+    elif database_url.query["prepared_statement_cache_size"] == "0":
+        connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+
+# Create the async SQLAlchemy Engine with a pooled set of persistent connections.
+# pool_pre_ping discards connections the server has dropped, and pool_recycle
+# retires them before idle timeouts on the server or a proxy can kill them.
+# READ COMMITTED is pinned on purpose: a conditional balance UPDATE that waits on
+# another transaction's row lock re-checks its WHERE clause against the committed
+# row and proceeds, whereas REPEATABLE READ / SERIALIZABLE would abort it with a
+# serialization failure under contention on a busy account.
+engine = create_async_engine(
+    database_url,
+    isolation_level="READ COMMITTED",
+    pool_size=20,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    connect_args=connect_args,
+    future=True,
+)
+
+# Create a session local class for interacting with the DB.
+# expire_on_commit=False keeps already-loaded attributes usable after a commit; with an
+# AsyncSession an expired attribute cannot be lazily reloaded and would raise instead.
+SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # Base class for your ORM models
 Base = declarative_base()
 
 # Dependency function to manage database session lifecycle
-def get_db():
+async def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
\ No newline at end of file
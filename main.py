@@ -2,8 +2,15 @@
 # FINAL AND COMPLETE main.py (Includes ALL Endpoints)
 # ==========================================================
 from fastapi import FastAPI, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from decimal import Decimal
+from typing import Optional
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+import logging
+import queue
 import sys
 
 # Direct imports (assuming database.py, models.py, schemas.py are in the same directory)
@@ -11,51 +18,179 @@ from database import get_db, engine
 import models, schemas 
 
 
-# Create the FastAPI app instance
-app = FastAPI(title="Financial Ledger API")
+logger = logging.getLogger("ledger")
 
 
 # ==========================================================
-# HELPER FUNCTIONS 
+# LOGGING SETUP
 # ==========================================================
 
-def calculate_account_balance(db: Session, account_id: int) -> Decimal:
-    """Calculates the current balance by summing all ledger entries."""
-    
-    entries = db.query(models.LedgerEntry).filter(
-        models.LedgerEntry.account_id == account_id
-    ).all()
-    
-    balance = Decimal(0)
-    
-    for entry in entries:
-        if entry.entry_type == 'credit':
-            balance += entry.amount
-        elif entry.entry_type == 'debit':
-            balance -= entry.amount
-    
-    return balance
+def configure_logging():
+    """Routes root log records through a queue so handler I/O never runs on the request path.
+
+    Returns the installed (QueueHandler, QueueListener) pair, or None if logging was already configured.
+    """
+    root_logger = logging.getLogger()
+    if root_logger.handlers:
+        # Logging was already configured by the host process; leave it alone
+        return None
+
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    queue_handler = QueueHandler(log_queue)
+    root_logger.addHandler(queue_handler)
+    # Only the app's own logger is raised to INFO; third-party loggers keep the WARNING default
+    logger.setLevel(logging.INFO)
+
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    return queue_handler, listener
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    queue_logging = configure_logging()
+    yield
+    if queue_logging is not None:
+        queue_handler, listener = queue_logging
+        listener.stop()
+        # Detach the handler too, so the next startup installs a fresh queue and listener
+        logging.getLogger().removeHandler(queue_handler)
 
-def create_new_account_in_db(db: Session, account: schemas.AccountCreate):
+
+# Create the FastAPI app instance
+app = FastAPI(title="Financial Ledger API", lifespan=lifespan)
+
+
+# ==========================================================
+# HELPER FUNCTIONS 
+# ==========================================================
+
+async def reject_balance_update(db: AsyncSession, account_id: int, currency: str, not_found_detail: str, insufficient_detail: str):
+    """Raises the HTTPException explaining why a conditional balance UPDATE matched no row."""
+    account = await db.get(models.Account, account_id)
+
+    if account is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found_detail)
+
+    if account.currency != currency:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Currency mismatch.")
+
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=insufficient_detail)
+
+
+async def _post_transaction(
+    db: AsyncSession,
+    txn_type: str,
+    currency: str,
+    amount: Decimal,
+    description: Optional[str],
+    entries: list[tuple[int, str, Decimal]],
+    not_found_detail: str,
+    insufficient_detail: str = "Insufficient funds in source account."
+) -> schemas.TransactionResponse:
+    """Atomically moves account balances and writes one Transaction with its LedgerEntry rows.
+
+    entries holds one (account_id, 'debit' | 'credit', amount) tuple per ledger entry.
+    """
+    async with db.begin():
+        # 1. Move the Balances (Prevent Overdraft)
+        #    A debit only matches while the account holds enough funds, so the overdraft check
+        #    and the write are one atomic statement. The UPDATEs lock the rows and are issued in
+        #    ascending account id order so concurrent transactions cannot deadlock.
+        for account_id, entry_type, entry_amount in sorted(entries, key=lambda entry: entry[0]):
+            balance_update = update(models.Account).where(
+                models.Account.id == account_id,
+                models.Account.currency == currency
+            )
+            if entry_type == "debit":
+                balance_update = balance_update.where(
+                    models.Account.current_balance >= entry_amount
+                ).values(current_balance=models.Account.current_balance - entry_amount)
+            else:
+                balance_update = balance_update.values(current_balance=models.Account.current_balance + entry_amount)
+
+            # 2. Reject the Transaction (404 / 400 / 403) if the UPDATE matched no row
+            if (await db.execute(balance_update)).rowcount == 0:
+                await reject_balance_update(db, account_id, currency, not_found_detail, insufficient_detail)
+
+        # 3. Create Parent Transaction Record (id and created_at come back via RETURNING)
+        new_transaction = (await db.execute(
+            insert(models.Transaction).values(
+                type=txn_type,
+                status="completed",
+                amount=amount,
+                currency=currency,
+                description=description
+            ).returning(models.Transaction.id, models.Transaction.created_at)
+        )).one()
+
+        # 4. Create all Ledger Entries in one multi-row INSERT
+        await db.execute(insert(models.LedgerEntry).values([
+            {"transaction_id": new_transaction.id, "account_id": account_id, "entry_type": entry_type, "amount": entry_amount}
+            for account_id, entry_type, entry_amount in entries
+        ]))
+
+    return schemas.TransactionResponse(
+        id=new_transaction.id,
+        type=txn_type,
+        status="completed",
+        amount=amount,
+        currency=currency,
+        description=description,
+        created_at=new_transaction.created_at
+    )
+
+
+def is_duplicate_account_error(error: IntegrityError) -> bool:
+    """Tells whether an account INSERT failed on the uq_user_currency constraint."""
+    # asyncpg reports the violated constraint on the driver exception the DBAPI error wraps
+    constraint_name = getattr(error.orig.__cause__, "constraint_name", None)
+    if constraint_name is not None:
+        return constraint_name == "uq_user_currency"
+
+    # SQLite doesn't name the constraint, but uq_user_currency is the only UNIQUE
+    # constraint an account INSERT can violate (the id is generated)
+    return getattr(error.orig, "sqlite_errorname", None) == "SQLITE_CONSTRAINT_UNIQUE"
+
+
+async def create_new_account_in_db(db: AsyncSession, account: schemas.AccountCreate):
     """Handles database insertion and unique constraint check."""
-    existing_account = db.query(models.Account).filter(
-        models.Account.user_id == account.user_id,
-        models.Account.currency == account.currency
-    ).first()
+    account_values = account.model_dump()
 
-    if existing_account:
+    # Insert without an intermediate ORM object; server-assigned columns come back via RETURNING.
+    # Uniqueness is left to the uq_user_currency constraint, which also closes the race
+    # between two concurrent requests for the same user and currency.
+    try:
+        new_account = (await db.execute(
+            insert(models.Account).values(**account_values).returning(
+                models.Account.id,
+                models.Account.status,
+                models.Account.current_balance,
+                models.Account.created_at,
+                models.Account.updated_at
+            )
+        )).one()
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if not is_duplicate_account_error(e):
+            raise
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"Account for user_id '{account.user_id}' with currency '{account.currency}' already exists."
         )
-
-    db_account = models.Account(**account.model_dump())
-    db.add(db_account)
-    db.commit()
-    db.refresh(db_account)
     
-    return db_account
+    return schemas.AccountResponse(
+        **account_values,
+        id=new_account.id,
+        status=new_account.status,
+        current_balance=new_account.current_balance,
+        created_at=new_account.created_at,
+        updated_at=new_account.updated_at
+    )
 
 
 # ==========================================================
@@ -63,19 +198,18 @@ def create_new_account_in_db(db: Session, account: schemas.AccountCreate):
 # ==========================================================
 
 @app.post("/accounts/", response_model=schemas.AccountResponse, status_code=status.HTTP_201_CREATED)
-def create_account(account: schemas.AccountCreate, db: Session = Depends(get_db)):
+async def create_account(account: schemas.AccountCreate, db: AsyncSession = Depends(get_db)):
     """Creates a new financial account for a user."""
-    new_account = create_new_account_in_db(db, account)
-    setattr(new_account, 'current_balance', 0.0) 
+    new_account = await create_new_account_in_db(db, account)
     return new_account
 
 @app.get("/accounts/{account_id}", response_model=schemas.AccountResponse)
-def read_account(account_id: int, db: Session = Depends(get_db)):
-    """Retrieves account details and calculates the current balance."""
+async def read_account(account_id: int, db: AsyncSession = Depends(get_db)):
+    """Retrieves account details, including the stored current balance."""
     
-    db_account = db.query(models.Account).filter(
-        models.Account.id == account_id
-    ).first()
+    db_account = (await db.execute(
+        select(models.Account).where(models.Account.id == account_id)
+    )).scalar_one_or_none()
     
     if db_account is None:
         raise HTTPException(
@@ -83,10 +217,6 @@ def read_account(account_id: int, db: Session = Depends(get_db)):
             detail=f"Account with ID {account_id} not found."
         )
     
-    current_balance = calculate_account_balance(db, account_id)
-    
-    setattr(db_account, 'current_balance', float(current_balance)) 
-    
     return db_account
 
 
@@ -95,174 +225,67 @@ def read_account(account_id: int, db: Session = Depends(get_db)):
 # ==========================================================
 
 @app.post("/transfers/", response_model=schemas.TransactionResponse, status_code=status.HTTP_201_CREATED)
-def create_transfer(transfer: schemas.TransferCreate, db: Session = Depends(get_db)):
+async def create_transfer(transfer: schemas.TransferCreate, db: AsyncSession = Depends(get_db)):
     """Executes a double-entry transfer between two accounts with concurrency control."""
     
     source_id = transfer.source_account_id
     dest_id = transfer.destination_account_id
-    transfer_amount = Decimal(str(transfer.amount))
 
     try:
-        with db.begin():
-            # 1. Lock Accounts (SELECT FOR UPDATE)
-            source_account = db.query(models.Account).filter(
-                models.Account.id == source_id
-            ).with_for_update().first()
-
-            dest_account = db.query(models.Account).filter(
-                models.Account.id == dest_id
-            ).with_for_update().first()
-
-            if not source_account or not dest_account:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Source or Destination account not found.")
-
-            if source_account.currency != transfer.currency or dest_account.currency != transfer.currency:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Currency mismatch.")
-
-            # 2. Check Balance Integrity (Prevent Overdraft)
-            current_source_balance = calculate_account_balance(db, source_id)
-            if current_source_balance < transfer_amount:
-                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient funds in source account.")
-
-            # 3. Create Parent Transaction Record
-            new_transaction = models.Transaction(
-                type="transfer",
-                status="completed",
-                amount=transfer_amount,
-                currency=transfer.currency,
-                description=transfer.description
-            )
-            db.add(new_transaction)
-            db.flush()
-            # 4. Create Ledger Entries (Debit and Credit)
-            debit_entry = models.LedgerEntry(
-                transaction_id=new_transaction.id,
-                account_id=source_id,
-                entry_type="debit",
-                amount=transfer_amount
-            )
-            credit_entry = models.LedgerEntry(
-                transaction_id=new_transaction.id,
-                account_id=dest_id,
-                entry_type="credit",
-                amount=transfer_amount
-            )
-            
-            db.add_all([debit_entry, credit_entry])
-
-            db.refresh(new_transaction)
-            setattr(new_transaction, 'amount', float(new_transaction.amount)) 
-            
-            return new_transaction
+        return await _post_transaction(
+            db, "transfer", transfer.currency, transfer.amount, transfer.description,
+            entries=[(source_id, "debit", transfer.amount), (dest_id, "credit", transfer.amount)],
+            not_found_detail="Source or Destination account not found."
+        )
 
     except HTTPException as e:
         raise e
-    except Exception as e:
-        db.rollback() 
-        print(f"Transfer failed unexpectedly: {e}")
+    except Exception:
+        await db.rollback() 
+        logger.exception("Transfer %s -> %s failed unexpectedly", source_id, dest_id)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred during the transfer.")
 
 
 @app.post("/deposits/", response_model=schemas.TransactionResponse, status_code=status.HTTP_201_CREATED)
-def create_deposit(deposit: schemas.TransferCreate, db: Session = Depends(get_db)):
+async def create_deposit(deposit: schemas.TransferCreate, db: AsyncSession = Depends(get_db)):
     """Simulates a deposit into an account."""
     
     # Note: We reuse TransferCreate schema for simplicity, using destination_account_id
     dest_id = deposit.destination_account_id
-    deposit_amount = Decimal(str(deposit.amount))
 
     try:
-        with db.begin():
-            # 1. Lock Destination Account
-            dest_account = db.query(models.Account).filter(
-                models.Account.id == dest_id
-            ).with_for_update().first()
-
-            if not dest_account:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Destination account not found.")
-
-            # 2. Create Parent Transaction
-            new_transaction = models.Transaction(
-                type="deposit",
-                status="completed",
-                amount=deposit_amount,
-                currency=deposit.currency,
-                description=deposit.description
-            )
-            db.add(new_transaction)
-            db.flush()
-            # 3. Create Ledger Entry (Credit Only)
-            credit_entry = models.LedgerEntry(
-                transaction_id=new_transaction.id,
-                account_id=dest_id,
-                entry_type="credit",
-                amount=deposit_amount
-            )
-            db.add(credit_entry)
-            
-            db.refresh(new_transaction)
-            setattr(new_transaction, 'amount', float(new_transaction.amount)) 
-            
-            return new_transaction
+        return await _post_transaction(
+            db, "deposit", deposit.currency, deposit.amount, deposit.description,
+            entries=[(dest_id, "credit", deposit.amount)],
+            not_found_detail="Destination account not found."
+        )
 
     except HTTPException as e:
         raise e
-    except Exception as e:
-        db.rollback() 
-        print(f"Deposit failed unexpectedly: {e}")
+    except Exception:
+        await db.rollback() 
+        logger.exception("Deposit to %s failed unexpectedly", dest_id)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred.")
 
 
 @app.post("/withdrawals/", response_model=schemas.TransactionResponse, status_code=status.HTTP_201_CREATED)
-def create_withdrawal(withdrawal: schemas.TransferCreate, db: Session = Depends(get_db)):
+async def create_withdrawal(withdrawal: schemas.TransferCreate, db: AsyncSession = Depends(get_db)):
     """Simulates a withdrawal from an account."""
     
     # Note: We reuse TransferCreate schema for simplicity, using source_account_id
     source_id = withdrawal.source_account_id
-    withdrawal_amount = Decimal(str(withdrawal.amount))
 
     try:
-        with db.begin():
-            # 1. Lock Source Account
-            source_account = db.query(models.Account).filter(
-                models.Account.id == source_id
-            ).with_for_update().first()
-
-            if not source_account:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Source account not found.")
-            
-            # 2. Check Balance Integrity
-            current_source_balance = calculate_account_balance(db, source_id)
-            if current_source_balance < withdrawal_amount:
-                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient funds for withdrawal.")
-
-            # 3. Create Parent Transaction
-            new_transaction = models.Transaction(
-                type="withdrawal",
-                status="completed",
-                amount=withdrawal_amount,
-                currency=withdrawal.currency,
-                description=withdrawal.description
-            )
-            db.add(new_transaction)
-            db.flush()
-            # 4. Create Ledger Entry (Debit Only)
-            debit_entry = models.LedgerEntry(
-                transaction_id=new_transaction.id,
-                account_id=source_id,
-                entry_type="debit",
-                amount=withdrawal_amount
-            )
-            db.add(debit_entry)
-            
-            db.refresh(new_transaction)
-            setattr(new_transaction, 'amount', float(new_transaction.amount)) 
-            
-            return new_transaction
+        return await _post_transaction(
+            db, "withdrawal", withdrawal.currency, withdrawal.amount, withdrawal.description,
+            entries=[(source_id, "debit", withdrawal.amount)],
+            not_found_detail="Source account not found.",
+            insufficient_detail="Insufficient funds for withdrawal."
+        )
 
     except HTTPException as e:
         raise e
-    except Exception as e:
-        db.rollback() 
-        print(f"Withdrawal failed unexpectedly: {e}")
+    except Exception:
+        await db.rollback() 
+        logger.exception("Withdrawal from %s failed unexpectedly", source_id)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred.")
\ No newline at end of file
@@ -1,14 +1,29 @@
 # models.py
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Text, CheckConstraint, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Text, CheckConstraint, UniqueConstraint, Index
+from sqlalchemy import select, update, func, case
 from sqlalchemy.orm import relationship
-from datetime import datetime
+import asyncio
 # Note the leading dot for relative import: .database
 from database import Base, engine 
 
 # --- Utility Function ---
 # Call this once to create all tables in the database
-def create_all_tables(engine):
-    Base.metadata.create_all(bind=engine)
+async def create_all_tables(engine):
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+# Recompute the stored Account.current_balance from the ledger (e.g. after adding the column)
+async def backfill_account_balances(engine):
+    signed_amount = case(
+        (LedgerEntry.entry_type == 'credit', LedgerEntry.amount),
+        else_=-LedgerEntry.amount
+    )
+    ledger_balance = select(func.coalesce(func.sum(signed_amount), 0)).where(
+        LedgerEntry.account_id == Account.id
+    ).scalar_subquery()
+
+    async with engine.begin() as connection:
+        await connection.execute(update(Account).values(current_balance=ledger_balance))
 
 # ----------------------------------------------------
 # 1. Account Model
@@ -21,15 +36,21 @@ class Account(Base):
     account_type = Column(String(20), nullable=False)
     currency = Column(String(3), nullable=False) # ISO 4217 code, e.g., USD
     status = Column(String(20), default="active", nullable=False)
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    # Running total of the account's ledger entries, maintained in the same DB transaction
+    current_balance = Column(Numeric(19, 4), nullable=False, default=0)
+    # Timestamps come from the database clock: INSERTs omit them (server_default), and
+    # every UPDATE, including each balance change, renders updated_at=now() in its SQL
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     __table_args__ = (
         UniqueConstraint(user_id, currency, name="uq_user_currency"),
         CheckConstraint('LENGTH(currency) = 3', name='currency_length_check'),
+        CheckConstraint('current_balance >= 0', name='non_negative_balance_check'),
     )
 
-    ledger_entries = relationship("LedgerEntry", back_populates="account")
+    # Never lazy-load an account's history by accident; load it with selectinload() when needed
+    ledger_entries = relationship("LedgerEntry", back_populates="account", lazy="raise")
 
 # ----------------------------------------------------
 # 2. Transaction Model (Parent operation)
@@ -43,9 +64,10 @@ class Transaction(Base):
     amount = Column(Numeric(19, 4), nullable=False)
     currency = Column(String(3), nullable=False)
     description = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    ledger_entries = relationship("LedgerEntry", back_populates="transaction")
+    # Never lazy-load by accident; load with selectinload() when needed
+    ledger_entries = relationship("LedgerEntry", back_populates="transaction", lazy="raise")
 
 
 # ----------------------------------------------------
@@ -56,16 +78,19 @@ class LedgerEntry(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     transaction_id = Column(Integer, ForeignKey("transaction.id"), nullable=False, index=True)
-    account_id = Column(Integer, ForeignKey("account.id"), nullable=False, index=True)
+    account_id = Column(Integer, ForeignKey("account.id"), nullable=False)
     
     entry_type = Column(String(10), nullable=False) # 'debit' or 'credit'
     
     amount = Column(Numeric(19, 4), nullable=False)
     
-    created_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     __table_args__ = (
         CheckConstraint('amount > 0', name='positive_ledger_amount'),
+        # Covers the per-account balance aggregate (filter on account_id, split on entry_type,
+        # sum amount) so it is answered by an index-only scan; also serves account_id lookups
+        Index('ix_ledger_acct_type_amt', 'account_id', 'entry_type', 'amount'),
     )
 
     transaction = relationship("Transaction", back_populates="ledger_entries")
@@ -78,6 +103,14 @@ if __name__ == "__main__":
     # TEMPORARY FIX FOR DIRECT EXECUTION (we will undo this later)
     from database import engine 
 
-    # Call the function to create tables
-    create_all_tables(engine)
-    print("Database tables created successfully!")
\ No newline at end of file
+    # Call the functions to create tables and backfill balances (one event loop for both)
+    async def setup_database():
+        await create_all_tables(engine)
+        print("Database tables created successfully!")
+
+        await backfill_account_balances(engine)
+        print("Account balances backfilled from the ledger.")
+
+        await engine.dispose()
+
+    asyncio.run(setup_database())
\ No newline at end of file
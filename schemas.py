@@ -1,14 +1,30 @@
 # schemas.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+from decimal import Decimal
+from functools import lru_cache
 from datetime import datetime
 from typing import Optional
 
+# --- Currency Validation ---
+# Requests repeat a handful of codes ("USD", "EUR", ...), so the result is memoized
+@lru_cache(maxsize=256)
+def _canonical_currency(code: str) -> str:
+    canonical = code.upper()
+    if len(canonical) != 3 or not canonical.isascii() or not canonical.isalpha():
+        raise ValueError("currency must be a 3-letter ISO 4217 code")
+    return canonical
+
 # --- Base Schemas (Used for Account Creation/Update) ---
 class AccountBase(BaseModel):
     user_id: str = Field(..., max_length=50)
     account_type: str = Field(..., max_length=20) # e.g., 'checking', 'savings'
     currency: str = Field(..., max_length=3) # ISO 4217, e.g., 'USD'
 
+    @field_validator('currency')
+    @classmethod
+    def validate_currency(cls, currency: str) -> str:
+        return _canonical_currency(currency)
+
 # --- Account Creation Schema (Input) ---
 class AccountCreate(AccountBase):
     # Inherits user_id, type, currency
@@ -19,7 +35,7 @@ class AccountCreate(AccountBase):
 class AccountResponse(AccountBase):
     id: int
     status: str
-    current_balance: float = 0.0 # Note: We'll keep it simple for display, but use Numeric in DB
+    current_balance: Decimal = Decimal(0) # Serialized as an exact decimal string, matching Numeric(19, 4) in the DB
     created_at: datetime
     updated_at: datetime
 
@@ -33,16 +49,21 @@ class AccountResponse(AccountBase):
 class TransferCreate(BaseModel):
     source_account_id: int
     destination_account_id: int
-    amount: float = Field(..., gt=0) # Amount must be greater than zero
+    amount: Decimal = Field(..., gt=0, max_digits=19, decimal_places=4) # Must be > 0 and fit Numeric(19, 4)
     currency: str = Field(..., max_length=3)
     description: Optional[str] = None
 
+    @field_validator('currency')
+    @classmethod
+    def validate_currency(cls, currency: str) -> str:
+        return _canonical_currency(currency)
+
 # --- Transaction Response Schema ---
 class TransactionResponse(BaseModel):
     id: int
     type: str
     status: str
-    amount: float
+    amount: Decimal # Serialized as an exact decimal string, e.g. "100.5"
     currency: str
     description: Optional[str] = None
     created_at: datetime
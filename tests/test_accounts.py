@@ -0,0 +1,20 @@
+# tests/test_accounts.py
+
+ACCOUNT = {"user_id": "alice", "account_type": "checking", "currency": "USD"}
+
+
+def test_duplicate_account_returns_409(client):
+    assert client.post("/accounts/", json=ACCOUNT).status_code == 201
+
+    response = client.post("/accounts/", json=ACCOUNT)
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Account for user_id 'alice' with currency 'USD' already exists."
+
+
+def test_same_user_may_hold_another_currency(client):
+    assert client.post("/accounts/", json=ACCOUNT).status_code == 201
+
+    response = client.post("/accounts/", json={**ACCOUNT, "currency": "EUR"})
+
+    assert response.status_code == 201
@@ -0,0 +1,66 @@
+# tests/test_query_budget.py
+# Each hot endpoint must send a fixed number of SQL statements (see the README's query
+# budget table). A lazy load on Account.ledger_entries or a re-introduced balance scan
+# pushes the count over budget and fails here.
+from decimal import Decimal
+
+READ_ACCOUNT_BUDGET = 1
+CREATE_ACCOUNT_BUDGET = 1
+DEPOSIT_BUDGET = 3
+WITHDRAWAL_BUDGET = 3
+TRANSFER_BUDGET = 4
+
+
+def test_read_account_query_budget(client, query_counter, create_account):
+    account_id = create_account("reader")
+
+    with query_counter() as queries:
+        response = client.get(f"/accounts/{account_id}")
+
+    assert response.status_code == 200
+    assert len(queries) <= READ_ACCOUNT_BUDGET, queries
+
+
+def test_create_account_query_budget(client, query_counter):
+    with query_counter() as queries:
+        response = client.post("/accounts/", json={"user_id": "creator", "account_type": "checking", "currency": "USD"})
+
+    assert response.status_code == 201
+    assert len(queries) <= CREATE_ACCOUNT_BUDGET, queries
+
+
+def test_deposit_query_budget(query_counter, create_account, post_money):
+    account_id = create_account("depositor")
+
+    with query_counter() as queries:
+        response = post_money("/deposits/", 0, account_id, "100.00")
+
+    assert response.status_code == 201
+    assert len(queries) <= DEPOSIT_BUDGET, queries
+
+
+def test_withdrawal_query_budget(query_counter, create_account, post_money):
+    account_id = create_account("withdrawer")
+    assert post_money("/deposits/", 0, account_id, "100.00").status_code == 201
+
+    with query_counter() as queries:
+        response = post_money("/withdrawals/", account_id, 0, "40.00")
+
+    assert response.status_code == 201
+    assert len(queries) <= WITHDRAWAL_BUDGET, queries
+
+
+def test_transfer_query_budget(client, query_counter, create_account, post_money):
+    source_id = create_account("sender")
+    dest_id = create_account("receiver")
+    assert post_money("/deposits/", 0, source_id, "100.00").status_code == 201
+
+    with query_counter() as queries:
+        response = post_money("/transfers/", source_id, dest_id, "25.00")
+
+    assert response.status_code == 201
+    assert len(queries) <= TRANSFER_BUDGET, queries
+
+    # The budget must not come at the cost of correctness
+    assert Decimal(client.get(f"/accounts/{source_id}").json()["current_balance"]) == Decimal("75")
+    assert Decimal(client.get(f"/accounts/{dest_id}").json()["current_balance"]) == Decimal("25")
@@ -0,0 +1,86 @@
+# tests/test_transactions.py
+# Rejection paths of the conditional balance UPDATEs: each must return its status code
+# and leave every balance and the ledger untouched (the whole transaction rolls back).
+from decimal import Decimal
+
+MISSING_ACCOUNT_ID = 999
+
+
+def balance(client, account_id):
+    return Decimal(client.get(f"/accounts/{account_id}").json()["current_balance"])
+
+
+def test_transfer_overdraft_returns_403(client, create_account, post_money):
+    source_id = create_account("sender")
+    dest_id = create_account("receiver")
+    assert post_money("/deposits/", 0, source_id, "50.00").status_code == 201
+
+    response = post_money("/transfers/", source_id, dest_id, "50.01")
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Insufficient funds in source account."
+    assert balance(client, source_id) == Decimal("50")
+    assert balance(client, dest_id) == Decimal("0")
+
+
+def test_transfer_to_lower_id_rolls_back_credit_on_overdraft(client, create_account, post_money):
+    # The credit to the lower id is applied before the debit fails; it must be rolled back
+    dest_id = create_account("receiver")
+    source_id = create_account("sender")
+
+    response = post_money("/transfers/", source_id, dest_id, "10.00")
+
+    assert response.status_code == 403
+    assert balance(client, dest_id) == Decimal("0")
+
+
+def test_withdrawal_overdraft_returns_403(client, create_account, post_money):
+    account_id = create_account("withdrawer")
+    assert post_money("/deposits/", 0, account_id, "10.00").status_code == 201
+
+    response = post_money("/withdrawals/", account_id, 0, "10.50")
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Insufficient funds for withdrawal."
+    assert balance(client, account_id) == Decimal("10")
+
+
+def test_transfer_to_missing_account_returns_404(client, create_account, post_money):
+    source_id = create_account("sender")
+    assert post_money("/deposits/", 0, source_id, "50.00").status_code == 201
+
+    response = post_money("/transfers/", source_id, MISSING_ACCOUNT_ID, "5.00")
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Source or Destination account not found."
+    assert balance(client, source_id) == Decimal("50")
+
+
+def test_deposit_to_missing_account_returns_404(post_money):
+    response = post_money("/deposits/", 0, MISSING_ACCOUNT_ID, "5.00")
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Destination account not found."
+
+
+def test_withdrawal_from_missing_account_returns_404(post_money):
+    response = post_money("/withdrawals/", MISSING_ACCOUNT_ID, 0, "5.00")
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Source account not found."
+
+
+def test_read_missing_account_returns_404(client):
+    assert client.get(f"/accounts/{MISSING_ACCOUNT_ID}").status_code == 404
+
+
+def test_currency_mismatch_returns_400(client, create_account, post_money):
+    source_id = create_account("sender")
+    dest_id = create_account("receiver", currency="EUR")
+    assert post_money("/deposits/", 0, source_id, "50.00").status_code == 201
+
+    response = post_money("/transfers/", source_id, dest_id, "5.00")
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Currency mismatch."
+    assert balance(client, source_id) == Decimal("50")